@@ -32,6 +32,16 @@ a cloud architecture recommendation including basic services needed (database,
 API gateway, compute, storage, etc.).
 """
 
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
+
 
 
 # === WRITTEN RESPONSE QUESTIONS ===
@@ -209,4 +219,445 @@ FINAL_REPORT_TEXT = (
     "---" + MAPPING_RESPONSE + "\n" +
     "---" + REUSABILITY_RESPONSE + "\n" +
     "---" + PRACTICAL_RESPONSE
-)
\ No newline at end of file
+)
+
+# === EXECUTABLE ORCHESTRATOR ===
+#
+# Runnable version of the RA -> (DIA, CIA, SIA) -> RCA pipeline described above.
+#
+# Agents are pluggable async callables: they take a JSON-serializable payload dict and
+# return either a dict or a JSON string. The orchestrator validates each output against
+# the agent's required fields, runs the refinement loop from QUESTION 2 when the output is
+# malformed, enforces per-agent timeouts, and memoizes outputs in a content-addressed cache
+# keyed by the agent and its exact inputs. Deterministic stub agents make the pipeline
+# runnable offline for demos, checks and benchmarks.
+#
+# Usage:
+#     python "Test Agent Orchestration for Cloud Architecture Planning.py"
+
+AgentOutput = Union[str, Dict[str, Any]]
+Agent = Callable[[Dict[str, Any]], Awaitable[AgentOutput]]
+
+# Required top-level fields of each agent's JSON output
+AGENT_SCHEMAS = {
+    "RA": ("functional_requirements", "non_functional_requirements"),
+    "DIA": ("db_type", "pii_classification", "integration_protocol"),
+    "CIA": ("compute_model", "networking", "sizing"),
+    "SIA": ("security_services", "auth_method", "compliance"),
+    "RCA": ("services", "monthly_cost_estimate", "report"),
+}
+ANALYSIS_AGENTS = ("DIA", "CIA", "SIA")
+DEFAULT_AGENT_TIMEOUT = 30.0  # seconds
+MAX_REFINEMENTS = 2
+
+SAMPLE_SCENARIOS = {
+    "Simple E-commerce Site": (
+        "Online store for small business (1000 daily users). Product catalog, shopping cart, "
+        "payment processing. Basic admin dashboard for inventory management."
+    ),
+    "Customer Support Chatbot": (
+        "AI chatbot for customer service. Integration with existing CRM system. "
+        "Handle 500+ conversations per day. Escalate complex issues to human agents."
+    ),
+    "Employee Expense Tracker": (
+        "Mobile app for expense reporting. Receipt photo upload and processing. "
+        "Approval workflow for managers. Integration with payroll system."
+    ),
+}
+
+logger = logging.getLogger(__name__)
+
+
+class AgentError(Exception):
+    """An agent could not produce a usable output."""
+
+    def __init__(self, agent: str, message: str):
+        super().__init__(f"{agent}: {message}")
+        self.agent = agent
+
+
+class AgentTimeoutError(AgentError):
+    """An agent did not answer within its timeout."""
+
+
+class AgentOutputError(AgentError):
+    """An agent kept returning schema-invalid output after the refinement loop."""
+
+
+def validate_agent_output(agent: str, raw: AgentOutput) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Parse and check an agent's output against AGENT_SCHEMAS.
+
+    Returns:
+        (output, None) when valid, otherwise (None, description of the problem)
+    """
+    if isinstance(raw, (str, bytes)):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            return None, "not valid JSON"
+    if not isinstance(raw, dict):
+        return None, f"a {type(raw).__name__} instead of a JSON object"
+    missing = [field for field in AGENT_SCHEMAS.get(agent, ()) if field not in raw]
+    if missing:
+        return None, f"missing the required {', '.join(repr(field) for field in missing)} field(s)"
+    return raw, None
+
+
+class AgentCache:
+    """
+    Content-addressed store of agent outputs.
+
+    Keys are SHA-256 digests of the agent name, its optional `version` attribute and
+    its canonical JSON inputs, so an unchanged scenario reuses every stage's output while
+    any change to the inputs (or agent version) misses. With a directory, entries are also
+    persisted as <digest>.json and survive restarts. get() and put() copy the output,
+    so callers can't mutate a cached entry.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(agent_name: str, agent: Agent, payload: Dict[str, Any]) -> str:
+        material = json.dumps(
+            {"agent": agent_name, "version": getattr(agent, "version", None), "inputs": payload},
+            sort_keys=True, separators=(",", ":"), default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        output = self._entries.get(key)
+        if output is None and self.directory and os.path.exists(self._path(key)):
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                output = self._entries[key] = json.load(f)
+        if output is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(output)
+
+    def put(self, key: str, output: Dict[str, Any]) -> None:
+        self._entries[key] = copy.deepcopy(output)
+        if self.directory:
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(output, f)
+            os.replace(tmp_path, self._path(key))
+
+
+class ArchitectureOrchestrator:
+    """
+    Runs RA, then DIA/CIA/SIA concurrently on the RA output, then RCA on everything.
+
+    Args:
+        agents: Mapping of agent name (RA, DIA, CIA, SIA, RCA) to async callable
+        timeouts: Per-agent timeouts in seconds, falling back to default_timeout
+        default_timeout: Timeout for agents not listed in timeouts
+        max_refinements: Re-runs allowed per agent after schema-invalid output
+        cache: Optional AgentCache; None disables memoization
+    """
+
+    def __init__(self, agents: Dict[str, Agent], timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: float = DEFAULT_AGENT_TIMEOUT, max_refinements: int = MAX_REFINEMENTS,
+                 cache: Optional[AgentCache] = None):
+        missing = [name for name in AGENT_SCHEMAS if name not in agents]
+        if missing:
+            raise ValueError(f"Missing agents: {', '.join(missing)}")
+        self.agents = agents
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.max_refinements = max_refinements
+        self.cache = cache
+
+    async def run_agent(self, name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one agent with cache lookup, timeout and the refinement loop."""
+        agent = self.agents[name]
+        cache_key = AgentCache.key(name, agent, payload) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        timeout = self.timeouts.get(name, self.default_timeout)
+        request = payload
+        for attempt in range(self.max_refinements + 1):
+            try:
+                raw = await asyncio.wait_for(agent(request), timeout)
+            except asyncio.TimeoutError:
+                raise AgentTimeoutError(name, f"no response within {timeout:g}s") from None
+            output, problem = validate_agent_output(name, raw)
+            if output is not None:
+                if cache_key:
+                    self.cache.put(cache_key, output)
+                return output
+            logger.warning("%s attempt %d: output was %s", name, attempt + 1, problem)
+            # Refinement loop: resend the original input with an explicit correction
+            request = dict(payload, refinement_instruction=(
+                f"The output was {problem}. Re-run and ensure the JSON schema is strictly followed "
+                f"(required fields: {', '.join(AGENT_SCHEMAS[name])})."
+            ))
+        raise AgentOutputError(name, f"schema-invalid output after {self.max_refinements} refinement(s)")
+
+    async def _timed(self, name: str, payload: Dict[str, Any],
+                     timings: Dict[str, float]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            return await self.run_agent(name, payload)
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    async def run(self, scenario: str, concurrent: bool = True) -> Dict[str, Any]:
+        """
+        Execute the full DAG for one scenario description.
+
+        Args:
+            scenario: Problem statement handed to the RA
+            concurrent: Fan DIA/CIA/SIA out concurrently (False runs them one after another)
+
+        Returns:
+            dict with 'outputs' per agent, the RCA 'report' and per-agent/total 'timings' (seconds)
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        requirements = await self._timed("RA", {"scenario": scenario}, timings)
+        analysis_payload = {"scenario": scenario, "requirements": requirements}
+        if concurrent:
+            tasks = [asyncio.ensure_future(self._timed(name, analysis_payload, timings))
+                     for name in ANALYSIS_AGENTS]
+            try:
+                analyses = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+        else:
+            analyses = [await self._timed(name, analysis_payload, timings) for name in ANALYSIS_AGENTS]
+        outputs = dict(zip(ANALYSIS_AGENTS, analyses), RA=requirements)
+
+        synthesis_payload = dict(analysis_payload, data=outputs["DIA"], compute=outputs["CIA"],
+                                 security=outputs["SIA"])
+        outputs["RCA"] = await self._timed("RCA", synthesis_payload, timings)
+        timings["total"] = time.perf_counter() - start
+
+        return {"scenario": scenario, "outputs": outputs, "report": outputs["RCA"]["report"], "timings": timings}
+
+    async def run_many(self, scenarios: Iterable[str], concurrent: bool = True) -> list:
+        """Run several scenarios; with concurrent=True they also overlap with each other."""
+        if concurrent:
+            return list(await asyncio.gather(*(self.run(s) for s in scenarios)))
+        return [await self.run(s, concurrent=False) for s in scenarios]
+
+    def run_sync(self, scenario: str, concurrent: bool = True) -> Dict[str, Any]:
+        """Blocking wrapper around run() for scripts."""
+        return asyncio.run(self.run(scenario, concurrent=concurrent))
+
+
+# --- Deterministic stub agents ---
+
+SERVICE_MONTHLY_COST = {
+    "Serverless Functions": 40, "Containers": 150, "API Gateway": 25, "CDN": 20,
+    "Managed NoSQL/Vector DB": 60, "Managed PostgreSQL": 90, "Object Storage": 10,
+    "In-memory Cache": 50, "Queue Service": 5, "WAF": 30, "Secrets Manager": 5,
+    "Identity Provider": 15, "Monitoring": 20,
+}
+
+
+def _load_from(scenario: str) -> int:
+    match = re.search(r"(\d[\d,]*)\+?\s*(?:daily|conversations|users|requests)", scenario)
+    return int(match.group(1).replace(",", "")) if match else 1000
+
+
+def make_stub_agents(latency: float = 0.05, malformed_first: Iterable[str] = ()) -> Dict[str, Agent]:
+    """
+    Build deterministic local agents that sleep `latency` seconds per call.
+
+    Agents named in malformed_first return schema-invalid JSON until they receive a
+    refinement_instruction, which exercises the refinement loop.
+    """
+    malformed_first = set(malformed_first)
+
+    def agent(name: str, build: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Agent:
+        async def run(payload: Dict[str, Any]) -> str:
+            await asyncio.sleep(latency)
+            output = build(payload)
+            if name in malformed_first and "refinement_instruction" not in payload:
+                output = {k: v for k, v in output.items() if k != AGENT_SCHEMAS[name][0]}
+            return json.dumps(output)
+        run.__name__ = f"stub_{name.lower()}"
+        run.version = "stub-1"
+        return run
+
+    def requirements(payload):
+        text = payload["scenario"].lower()
+        return {
+            "functional_requirements": [s.strip() for s in payload["scenario"].split(".") if s.strip()],
+            "non_functional_requirements": {
+                "daily_load": _load_from(text),
+                "bursty": "chatbot" in text or "mobile" in text,
+                "latency_ms": 500 if "chatbot" in text else 1000,
+            },
+            "handles_pii": any(word in text for word in ("payment", "crm", "payroll", "receipt")),
+            "integrations": [word for word in ("crm", "payroll", "payment") if word in text],
+        }
+
+    def data(payload):
+        ra = payload["requirements"]
+        text = payload["scenario"].lower()
+        return {
+            "db_type": "Managed NoSQL/Vector DB" if "chatbot" in text else "Managed PostgreSQL",
+            "pii_classification": "high" if ra["handles_pii"] else "low",
+            "integration_protocol": "Queue Service" if ra["integrations"] else "REST",
+            "file_storage": "Object Storage" if any(w in text for w in ("photo", "upload", "catalog")) else None,
+        }
+
+    def compute(payload):
+        nfr = payload["requirements"]["non_functional_requirements"]
+        serverless = nfr["bursty"] or nfr["daily_load"] < 10000
+        return {
+            "compute_model": "Serverless Functions" if serverless else "Containers",
+            "networking": ["API Gateway"] + (["CDN"] if "store" in payload["scenario"].lower() else []),
+            "sizing": {"peak_rps": max(1, nfr["daily_load"] // 8640)},
+            "cache": "In-memory Cache" if nfr["latency_ms"] <= 500 else None,
+        }
+
+    def security(payload):
+        ra = payload["requirements"]
+        return {
+            "security_services": ["WAF", "Secrets Manager", "Monitoring"],
+            "auth_method": "OAuth 2.0 / OIDC via Identity Provider",
+            "compliance": ["PII encryption at rest"] if ra["handles_pii"] else [],
+        }
+
+    def synthesis(payload):
+        data_out, compute_out, security_out = payload["data"], payload["compute"], payload["security"]
+        services = [compute_out["compute_model"], *compute_out["networking"], data_out["db_type"],
+                    data_out["file_storage"], compute_out["cache"],
+                    data_out["integration_protocol"] if data_out["integration_protocol"] != "REST" else None,
+                    *security_out["security_services"], "Identity Provider"]
+        services = [s for s in dict.fromkeys(services) if s]
+        cost = sum(SERVICE_MONTHLY_COST.get(s, 0) for s in services)
+        lines = ["# Architecture Recommendation", "", payload["scenario"], "", "## Services"]
+        lines += [f"- {s} (~${SERVICE_MONTHLY_COST.get(s, 0)}/month)" for s in services]
+        lines += ["", f"**Estimated monthly cost:** ~${cost}", f"**Authentication:** {security_out['auth_method']}"]
+        return {"services": services, "monthly_cost_estimate": cost, "report": "\n".join(lines)}
+
+    builders = {"RA": requirements, "DIA": data, "CIA": compute, "SIA": security, "RCA": synthesis}
+    return {name: agent(name, build) for name, build in builders.items()}
+
+
+# --- Benchmark: serial vs concurrent fan-out, cold vs cached ---
+
+def benchmark_orchestrator(latency: float = 0.05, scenarios: Optional[Dict[str, str]] = None) -> Dict[str, float]:
+    """Wall-clock seconds for serial, concurrent and fully cached runs over the sample scenarios."""
+    descriptions = list((scenarios or SAMPLE_SCENARIOS).values())
+    agents = make_stub_agents(latency=latency)
+    results = {}
+
+    async def timed_run(orchestrator, concurrent):
+        start = time.perf_counter()
+        reports = await orchestrator.run_many(descriptions, concurrent=concurrent)
+        return time.perf_counter() - start, reports
+
+    serial_time, serial = asyncio.run(timed_run(ArchitectureOrchestrator(agents), False))
+    concurrent_time, parallel = asyncio.run(timed_run(ArchitectureOrchestrator(agents), True))
+    assert [r["report"] for r in serial] == [r["report"] for r in parallel]
+
+    cached = ArchitectureOrchestrator(agents, cache=AgentCache())
+    asyncio.run(cached.run_many(descriptions))
+    cached_time, _ = asyncio.run(timed_run(cached, True))
+
+    results["serial_s"] = serial_time
+    results["concurrent_s"] = concurrent_time
+    results["cached_s"] = cached_time
+    results["speedup"] = serial_time / concurrent_time
+    results["cache_hits"] = cached.cache.hits
+    return results
+
+
+# --- Checks: timeouts, refinement exhaustion, cache invalidation ---
+
+def check_orchestrator() -> None:
+    """Deterministic checks of the failure paths, driven by stub agents."""
+    scenario = SAMPLE_SCENARIOS["Customer Support Chatbot"]
+
+    # A slow agent raises AgentTimeoutError naming that agent
+    agents = make_stub_agents(latency=0)
+    agents["CIA"] = make_stub_agents(latency=1.0)["CIA"]
+    orchestrator = ArchitectureOrchestrator(agents, timeouts={"CIA": 0.05})
+    try:
+        orchestrator.run_sync(scenario)
+    except AgentTimeoutError as e:
+        assert e.agent == "CIA", e
+    else:
+        raise AssertionError("slow CIA should time out")
+
+    # Output that never validates ends with AgentOutputError after every refinement
+    agents = make_stub_agents(latency=0, malformed_first=("DIA",))
+    stub_dia, calls = agents["DIA"], []
+
+    async def stubborn_dia(payload):
+        # Ignores refinement_instruction, so the stub keeps omitting a required field
+        calls.append(payload)
+        return await stub_dia({k: v for k, v in payload.items() if k != "refinement_instruction"})
+
+    agents["DIA"] = stubborn_dia
+    orchestrator = ArchitectureOrchestrator(agents, max_refinements=2)
+    try:
+        orchestrator.run_sync(scenario)
+    except AgentOutputError as e:
+        assert e.agent == "DIA", e
+    else:
+        raise AssertionError("DIA output should never validate")
+    assert len(calls) == 3 and all("refinement_instruction" in p for p in calls[1:])
+
+    # Malformed-until-refined output is repaired by the refinement loop
+    agents = make_stub_agents(latency=0, malformed_first=("CIA",))
+    result = ArchitectureOrchestrator(agents).run_sync(scenario)
+    assert result["outputs"]["CIA"]["compute_model"]
+
+    # An unchanged scenario hits the cache for every agent; a changed one misses for every agent
+    cache = AgentCache()
+    orchestrator = ArchitectureOrchestrator(make_stub_agents(latency=0), cache=cache)
+    first = orchestrator.run_sync(scenario)
+    assert (cache.hits, cache.misses) == (0, len(AGENT_SCHEMAS))
+    assert orchestrator.run_sync(scenario)["report"] == first["report"]
+    assert (cache.hits, cache.misses) == (len(AGENT_SCHEMAS), len(AGENT_SCHEMAS))
+    changed = orchestrator.run_sync(scenario + " Send SMS alerts.")
+    assert (cache.hits, cache.misses) == (len(AGENT_SCHEMAS), 2 * len(AGENT_SCHEMAS))
+    assert changed["report"] != first["report"]
+
+    # Cached outputs are copies: mutating a result must not change the next hit
+    first["outputs"]["RA"]["integrations"].append("mutated")
+    assert "mutated" not in orchestrator.run_sync(scenario)["outputs"]["RA"]["integrations"]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    check_orchestrator()
+    print("Orchestrator checks passed")
+
+    # Refinement loop demo: CIA omits compute_model until it is told to fix its output
+    orchestrator = ArchitectureOrchestrator(make_stub_agents(latency=0.01, malformed_first=("CIA",)),
+                                            cache=AgentCache())
+    result = orchestrator.run_sync(SAMPLE_SCENARIOS["Customer Support Chatbot"])
+    print(result["report"])
+    print("Stage timings (s):", {name: round(value, 3) for name, value in result["timings"].items()})
+
+    print("\nOrchestrator benchmark (3 scenarios, 50 ms per agent call):")
+    for key, value in benchmark_orchestrator().items():
+        print(f"  {key}: {value:.3f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
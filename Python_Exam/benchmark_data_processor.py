@@ -0,0 +1,564 @@
+"""
+Benchmarks for the DataProcessor hot paths.
+
+All I/O goes to local stand-ins (threaded stub HTTP and SMTP servers, an
+in-memory S3 client, temporary files), so results are reproducible without network access
+or credentials. Every run also collects the per-operation latency histograms from the
+instrumentation registry.
+
+Usage:
+    python benchmark_data_processor.py
+    python benchmark_data_processor.py --record results/baseline.json
+    python benchmark_data_processor.py --compare results/baseline.json --tolerance 0.25
+    python benchmark_data_processor.py --only db_queries --metrics prometheus
+    python benchmark_data_processor.py --only cold_start
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import smtplib
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from email.mime.text import MIMEText
+
+from instrumentation import REGISTRY, MetricsRegistry, compare_results, record_results
+from Security_Issue_Python_code_unmarked import DataProcessor, EmailOutbox
+
+
+class _StubAPIHandler(BaseHTTPRequestHandler):
+    """Echoes JSON bodies back after an artificial latency."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    # Headers and body go out as separate small writes; with Nagle on, every
+    # keep-alive response would stall ~40 ms on the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        time.sleep(self.server.latency)
+        payload = json.dumps({"echo": json.loads(body or b"null")}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubAPIServer:
+    """Local HTTP server standing in for API_BASE_URL / WEBHOOK_ENDPOINT."""
+
+    def __init__(self, latency=0.01):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _StubAPIHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: greeting, EHLO, MAIL/RCPT/DATA, NOOP, RSET, QUIT."""
+
+    def _reply(self, line):
+        time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        # Connection setup stands in for TCP + STARTTLS + AUTH round trips
+        time.sleep(self.server.handshake_latency)
+        self._reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self._reply("250 stub")
+            elif command == b"DATA":
+                self._reply("354 end with <CRLF>.<CRLF>")
+                lines = []
+                for data_line in iter(self.rfile.readline, b""):
+                    if data_line == b".\r\n":
+                        break
+                    lines.append(data_line)
+                with self.server.lock:
+                    self.server.messages.append(b"".join(lines))
+                self._reply("250 queued")
+            elif command == b"RCPT" and b"refused" in line:
+                self._reply("550 no such user")
+            elif command == b"QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("250 ok")
+
+
+class StubSMTPServer:
+    """Local SMTP server standing in for SMTP_SERVER (no TLS, no AUTH)."""
+
+    def __init__(self, latency=0.001, handshake_latency=0.03):
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _StubSMTPHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.handshake_latency = handshake_latency
+        self.server.messages = []
+        self.server.connections = 0
+        self.server.lock = threading.Lock()
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def messages(self):
+        return self.server.messages
+
+    @property
+    def connections(self):
+        return self.server.connections
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubS3Client:
+    """
+    In-memory stand-in for the boto3 S3 client calls DataProcessor makes.
+
+    Every request pays `latency` seconds plus transfer time at `bandwidth`
+    bytes/second per stream, so parallel part uploads overlap like they would
+    against a real endpoint.
+    """
+
+    def __init__(self, latency=0.005, bandwidth=200 * 1024 * 1024, page_size=1000):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.page_size = page_size  # uploads per list_multipart_uploads page
+        self.objects = {}
+        self.uploads = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _transfer(self, nbytes):
+        time.sleep(self.latency + nbytes / self.bandwidth)
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None):
+        # boto3's single-stream path: read and send the file sequentially
+        with open(Filename, "rb") as f:
+            data = f.read()
+        self._transfer(len(data))
+        self.objects[(Bucket, Key)] = data
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        data = Body.read() if hasattr(Body, "read") else bytes(Body)
+        self._transfer(len(data))
+        self.objects[(Bucket, Key)] = data
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        with self._lock:
+            upload_id = f"upload-{next(self._ids)}"
+            self.uploads[upload_id] = {"Key": Key, "Initiated": time.time(), "Parts": {}}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        data = bytes(Body)
+        self._transfer(len(data))
+        etag = f'"{hashlib.md5(data).hexdigest()}"'  # S3 part ETag (SSE-S3)
+        with self._lock:
+            self.uploads[UploadId]["Parts"][PartNumber] = (etag, data)
+        return {"ETag": etag}
+
+    def list_multipart_uploads(self, Bucket, Prefix="", KeyMarker="", UploadIdMarker=""):
+        uploads = sorted(
+            (u["Key"], upload_id, u["Initiated"]) for upload_id, u in self.uploads.items()
+            if u["Key"].startswith(Prefix) and (u["Key"], upload_id) > (KeyMarker, UploadIdMarker)
+        )
+        page = uploads[:self.page_size]
+        response = {
+            "IsTruncated": len(uploads) > self.page_size,
+            "Uploads": [{"Key": k, "UploadId": i, "Initiated": t} for k, i, t in page],
+        }
+        if response["IsTruncated"]:
+            response["NextKeyMarker"], response["NextUploadIdMarker"] = page[-1][0], page[-1][1]
+        return response
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+
+    def list_parts(self, Bucket, Key, UploadId, PartNumberMarker=0):
+        parts = sorted(self.uploads[UploadId]["Parts"].items())
+        return {"IsTruncated": False, "Parts": [
+            {"PartNumber": n, "ETag": etag, "Size": len(data)}
+            for n, (etag, data) in parts if n > PartNumberMarker
+        ]}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        upload = self.uploads.pop(UploadId)
+        self.objects[(Bucket, Key)] = b"".join(
+            upload["Parts"][p["PartNumber"]][1] for p in MultipartUpload["Parts"]
+        )
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def benchmark_external_api(n_requests=200, latency=0.01, concurrency=20):
+    """Compare serial call_external_api with call_external_api_many."""
+    payloads = [{"seq": i} for i in range(n_requests)]
+    with StubAPIServer(latency=latency) as server:
+        processor = DataProcessor(api_base_url=server.base_url)
+
+        serial, serial_time = _timed(lambda: [processor.call_external_api(p) for p in payloads])
+        batched, batched_time = _timed(
+            processor.call_external_api_many, payloads, concurrency=concurrency, rate_limit=None
+        )
+        assert serial == batched, "batched results must match the serial path"
+
+    return {
+        "requests": n_requests,
+        "serial_rps": n_requests / serial_time,
+        "batched_rps": n_requests / batched_time,
+        "speedup": serial_time / batched_time,
+    }
+
+
+def benchmark_upload(n_files=4, file_size=48 * 1024 * 1024, part_size=8 * 1024 * 1024,
+                     max_concurrency=8):
+    """Compare per-file upload_to_cloud with parallel multipart upload_many."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(n_files):
+            path = os.path.join(tmp, f"export_{i}.bin")
+            with open(path, "wb") as f:
+                f.write(os.urandom(file_size))
+            paths.append(path)
+
+        single = StubS3Client()
+        processor = DataProcessor(s3_client=single)
+        _, single_time = _timed(lambda: [processor.upload_to_cloud(p) for p in paths])
+
+        multipart = StubS3Client()
+        processor = DataProcessor(s3_client=multipart)
+        results, multipart_time = _timed(
+            processor.upload_many, paths, part_size=part_size, max_concurrency=max_concurrency
+        )
+        assert all(results.values()) and multipart.objects == single.objects
+
+    total_mb = n_files * file_size / (1024 * 1024)
+    return {
+        "files": n_files,
+        "single_stream_mb_s": total_mb / single_time,
+        "multipart_mb_s": total_mb / multipart_time,
+        "speedup": single_time / multipart_time,
+    }
+
+
+def benchmark_email(n_messages=100):
+    """Compare a connection per notification with the batched EmailOutbox."""
+    recipients = [f"user{i}@example.com" for i in range(n_messages)]
+    with StubSMTPServer() as server:
+        def connect_per_message():
+            # The pre-outbox send_notification_email pattern
+            for recipient in recipients:
+                smtp = smtplib.SMTP("127.0.0.1", server.port, timeout=10)
+                message = MIMEText("body")
+                message["From"], message["To"], message["Subject"] = "bench@example.com", recipient, "alert"
+                smtp.send_message(message)
+                smtp.quit()
+
+        _, per_message_time = _timed(connect_per_message)
+
+        outbox = EmailOutbox(host="127.0.0.1", port=server.port, password=None, use_tls=False)
+        processor = DataProcessor(email_outbox=outbox)
+
+        def outbox_send():
+            for recipient in recipients:
+                processor.send_notification_email(recipient, "alert", "body")
+            processor.flush_notifications()
+
+        _, outbox_time = _timed(outbox_send)
+        # A refused recipient fails that message only; the session stays open
+        connections = server.connections
+        processor.send_notification_email("refused@example.com", "alert", "body")
+        processor.send_notification_email(recipients[0], "alert", "body")
+        processor.flush_notifications()
+        assert outbox.failed == 1 and server.connections == connections
+        outbox.close()
+        assert outbox.sent == n_messages + 1 and len(server.messages) == 2 * n_messages + 1
+
+        # warm_up(email=True) opens the SMTP session up front; the first notification reuses it
+        outbox = EmailOutbox(host="127.0.0.1", port=server.port, password=None, use_tls=False)
+        processor = DataProcessor(email_outbox=outbox)
+        connections = server.connections
+        assert processor.warm_up(db=False, http=False, email=True)["email"] is not None
+        assert server.connections == connections + 1
+        processor.send_notification_email(recipients[0], "alert", "body")
+        processor.flush_notifications()
+        assert outbox.sent == 1 and server.connections == connections + 1
+        outbox.close()
+
+    return {
+        "messages": n_messages,
+        "per_connection_msgs_s": n_messages / per_message_time,
+        "outbox_msgs_s": n_messages / outbox_time,
+        "speedup": per_message_time / outbox_time,
+    }
+
+
+def _seed_users(processor, n_users):
+    conn, cursor = processor.connect_to_database()
+    cursor.executemany(
+        "INSERT OR REPLACE INTO user_data (id, username, created_at) VALUES (?, ?, ?)",
+        ((i, f"user{i}", "2024-01-01") for i in range(n_users))
+    )
+    conn.commit()
+
+
+def benchmark_webhooks(n_events=500, latency=0.005, workers=4):
+    """Compare per-event process_webhook_data with the batched WebhookPipeline."""
+    events = [{"action": "delete_user" if i % 2 else "update", "user_id": i} for i in range(n_events)]
+    with tempfile.TemporaryDirectory() as tmp, StubAPIServer(latency=latency) as server:
+        processor = DataProcessor(db_path=os.path.join(tmp, "serial.db"), webhook_endpoint=server.base_url)
+        _seed_users(processor, n_events)
+        _, serial_time = _timed(lambda: [processor.process_webhook_data(e) for e in events])
+        processor.db_pool.close_all()
+
+        processor = DataProcessor(db_path=os.path.join(tmp, "pipeline.db"), webhook_endpoint=server.base_url)
+        _seed_users(processor, n_events)
+        pipeline = processor.start_webhook_pipeline(workers=workers)
+
+        def run_pipeline():
+            for event in events:
+                processor.enqueue_webhook_data(event)
+            pipeline.flush()
+
+        _, pipeline_time = _timed(run_pipeline)
+        pipeline.close()
+        metrics = pipeline.metrics()
+        assert metrics["processed"] == n_events
+        processor.db_pool.close_all()
+
+    return {
+        "events": n_events,
+        "serial_events_s": n_events / serial_time,
+        "pipeline_events_s": n_events / pipeline_time,
+        "speedup": serial_time / pipeline_time,
+        "max_queue_depth": metrics["max_queue_depth"],
+        "forward_p95_ms": metrics["stages"]["forward"]["p95_ms"],
+        "end_to_end_p95_ms": metrics["stages"]["end_to_end"]["p95_ms"],
+    }
+
+
+def benchmark_db_queries(n_users=5000, lookups=2000):
+    """Compare per-id fetch_user_data with one fetch_users call (IN list and temp-table paths)."""
+    rng = random.Random(0)
+    ids = [rng.randrange(n_users) for _ in range(lookups)]
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(db_path=os.path.join(tmp, "users.db"))
+        _seed_users(processor, n_users)
+
+        per_id, per_id_time = _timed(lambda: {i: processor.fetch_user_data(i) for i in ids})
+        bulk, bulk_time = _timed(processor.fetch_users, ids)
+        small = ids[:500]
+        _, in_list_time = _timed(processor.fetch_users, small)
+        assert bulk == per_id
+        # None and non-integer ids are ignored the same way by the IN list and the temp table
+        for requested in (list(range(500)), list(range(1000))):
+            found = processor.fetch_users(requested + [None, "abc", 1.5])
+            assert sorted(found) == requested, "only requested ids may be returned"
+        processor.db_pool.close_all()
+
+    return {
+        "lookups": lookups,
+        "per_id_rps": lookups / per_id_time,
+        "bulk_rps": lookups / bulk_time,
+        "in_list_500_ms": in_list_time * 1000,
+        "speedup": per_id_time / bulk_time,
+    }
+
+
+def benchmark_instrumentation_overhead(iterations=200_000):
+    """Cost of one timer() block with the registry enabled and disabled."""
+    def run(registry):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with registry.timer("noop"):
+                pass
+        return (time.perf_counter() - start) / iterations * 1e9
+
+    return {
+        "enabled_timer_ns": run(MetricsRegistry()),
+        "disabled_timer_ns": run(MetricsRegistry(enabled=False)),
+    }
+
+
+MODULE_NAME = "Security_Issue_Python_code_unmarked"
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+# What the module used to import eagerly at the top, before lazy loading
+EAGER_DEPENDENCIES = ("requests", "json", "sqlite3", "asyncio", "concurrent.futures.thread", "urllib3")
+
+# Runs in a fresh interpreter; prints module count and per-step seconds for the first calls
+_COLD_START_SCRIPT = f"""
+import sys, time
+before = len(sys.modules)
+start = time.perf_counter()
+import {MODULE_NAME} as module
+imported = time.perf_counter()
+modules = len(sys.modules) - before
+processor = module.DataProcessor(db_path=sys.argv[1])
+constructed = time.perf_counter()
+processor.fetch_user_data(1)
+first_db = time.perf_counter()
+processor.fetch_user_data(1)
+warm_db = time.perf_counter()
+processor.session
+session = time.perf_counter()
+print(modules, imported - start, constructed - imported,
+      first_db - constructed, warm_db - first_db, session - warm_db)
+"""
+
+
+def _importtime(statement, *args):
+    """
+    Run `statement` in a fresh interpreter with -X importtime.
+
+    Returns:
+        tuple: ({top-level module: cumulative import ms}, stdout)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement, *args],
+        cwd=MODULE_DIR, capture_output=True, text=True, check=True
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:]
+        if not name.startswith(" "):  # nested imports are indented
+            cumulative[name] = int(parts[1]) / 1000
+    return cumulative, proc.stdout
+
+
+def benchmark_cold_start(runs=7):
+    """Import time (-X importtime) and first-call latency of the module in fresh interpreters."""
+    samples = {key: [] for key in (
+        "import_ms", "eager_import_ms", "init_ms", "first_db_call_ms", "warm_db_call_ms", "first_session_ms"
+    )}
+    modules = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(runs):
+            db_path = os.path.join(tmp, f"cold_{run}.db")
+            imports, stdout = _importtime(_COLD_START_SCRIPT, db_path)
+            fields = stdout.split()
+            modules = int(fields[0])
+            seconds = [float(value) for value in fields[1:]]
+            samples["import_ms"].append(imports[MODULE_NAME])
+            for key, value in zip(("init_ms", "first_db_call_ms", "warm_db_call_ms", "first_session_ms"), seconds[1:]):
+                samples[key].append(value * 1000)
+
+            # Same interpreter state, plus the dependencies the module used to import up front
+            eager, _ = _importtime(f"import {', '.join(EAGER_DEPENDENCIES)}; import {MODULE_NAME}")
+            samples["eager_import_ms"].append(sum(eager.get(name, 0.0) for name in EAGER_DEPENDENCIES + (MODULE_NAME,)))
+
+    results = {"runs": runs, "modules_imported": modules}
+    results.update({key: statistics.median(values) for key, values in samples.items()})
+    results["import_speedup"] = results["eager_import_ms"] / results["import_ms"]
+    return results
+
+
+BENCHMARKS = {
+    "external_api": ("call_external_api vs call_external_api_many:", benchmark_external_api),
+    "upload": ("upload_to_cloud vs upload_many:", benchmark_upload),
+    "email": ("per-message SMTP vs EmailOutbox:", benchmark_email),
+    "webhooks": ("process_webhook_data vs WebhookPipeline:", benchmark_webhooks),
+    "db_queries": ("fetch_user_data vs fetch_users:", benchmark_db_queries),
+    "instrumentation": ("instrumentation timer overhead:", benchmark_instrumentation_overhead),
+    "cold_start": ("module import and first-call latency (fresh interpreter):", benchmark_cold_start),
+}
+
+
+def _report(title, results):
+    print(title)
+    for key, value in results.items():
+        print(f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+def run_benchmarks(names=None):
+    """Run the selected benchmarks (all by default) and return {name: results}."""
+    # Fixed seeds keep jittered backoff and synthetic data identical between runs
+    random.seed(0)
+    results = {}
+    for name in names or BENCHMARKS:
+        title, benchmark = BENCHMARKS[name]
+        results[name] = benchmark()
+        _report(title, results[name])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--record", metavar="PATH", help="write results and metrics to a JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="recorded baseline to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--metrics", choices=("json", "prometheus"), help="print the operation metrics")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("Security_Issue_Python_code_unmarked").setLevel(logging.WARNING)
+    REGISTRY.reset()
+    results = run_benchmarks(args.only)
+
+    if args.metrics == "json":
+        print(REGISTRY.to_json())
+    elif args.metrics == "prometheus":
+        print(REGISTRY.to_prometheus(), end="")
+    if args.record:
+        record_results(args.record, results)
+        print(f"Recorded results to {args.record}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_results(baseline, results, args.tolerance)
+        for bench, metric, base, value, change in regressions:
+            print(f"REGRESSION {bench}.{metric}: {base:.4g} -> {value:.4g} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""
+Lightweight hot-path instrumentation shared by DataProcessor and the exam notebook.
+
+Operations (DB query, API call, S3 upload, cache get, ...) are timed into
+fixed-bucket latency histograms with call and error counts. Snapshots can be
+exported as JSON or Prometheus text, and benchmark results can be recorded and
+compared against a baseline so regressions show up as a non-zero exit code.
+
+Usage:
+    from instrumentation import REGISTRY, instrumented
+
+    with REGISTRY.timer("db_query"):
+        cursor.execute(query, params)
+
+    @instrumented("cache_get")
+    def get(key): ...
+
+    print(REGISTRY.to_prometheus())
+"""
+
+import functools
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Upper bounds in seconds (10 us .. 10 s), Prometheus-style cumulative buckets
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Benchmark result keys whose value should go up (throughput) or down (latency)
+HIGHER_IS_BETTER_SUFFIXES = ("_rps", "_per_s", "_mb_s", "_msgs_s", "_events_s", "speedup")
+# Throughput suffixes are checked first, so "_mb_s" is not mistaken for seconds
+LOWER_IS_BETTER_SUFFIXES = ("_ms", "_us", "_ns", "_s")
+
+
+class Histogram:
+    """Latency histogram for one operation: bucket counts, sum, min/max and errors."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "min", "max", "errors", "_lock")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        index = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds < self.min:
+                self.min = seconds
+            if seconds > self.max:
+                self.max = seconds
+            if error:
+                self.errors += 1
+
+    def quantile(self, q):
+        """Estimate the q-quantile (seconds) by interpolating inside its bucket."""
+        with self._lock:
+            counts, count, low, high = list(self.counts), self.count, self.min, self.max
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else high
+                lower, upper = max(lower, low), min(upper, high)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return high
+
+    def snapshot(self):
+        with self._lock:
+            count, total, errors = self.count, self.total, self.errors
+            low, high, counts = self.min, self.max, list(self.counts)
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip(self.bounds + ("+Inf",), counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": count,
+            "errors": errors,
+            "sum_s": total,
+            "avg_ms": total / count * 1000 if count else 0.0,
+            "min_ms": low * 1000 if count else 0.0,
+            "p50_ms": self.quantile(0.50) * 1000,
+            "p95_ms": self.quantile(0.95) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+            "max_ms": high * 1000,
+            "buckets": buckets,
+        }
+
+
+class _Timer:
+    """Context manager behind MetricsRegistry.timer (a plain class is cheaper than a generator)."""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+
+_DISABLED_TIMER = nullcontext()
+
+
+class MetricsRegistry:
+    """
+    Named histograms and counters with JSON / Prometheus export.
+
+    Args:
+        prefix: Metric name prefix used by to_prometheus()
+        buckets: Histogram bucket upper bounds in seconds
+        enabled: When False, timer() and observe() are no-ops
+    """
+
+    def __init__(self, prefix="app", buckets=DEFAULT_BUCKETS, enabled=True):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, name, seconds, error=False):
+        if self.enabled:
+            self.histogram(name).observe(seconds, error)
+
+    def increment(self, name, value=1):
+        """Add to a plain counter (e.g. cache hits); exported as <prefix>_<name>_total."""
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def timer(self, name):
+        """Context manager timing the enclosed block; exceptions are counted as errors."""
+        if not self.enabled:
+            return _DISABLED_TIMER
+        return _Timer(self.histogram(name))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """{'operations': {name: histogram summary}, 'counters': {name: value}}"""
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+        return {
+            "operations": {name: histograms[name].snapshot() for name in sorted(histograms)},
+            "counters": dict(sorted(counters.items())),
+        }
+
+    def to_json(self, indent=2):
+        import json
+
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (histograms labelled by operation)."""
+        snapshot = self.snapshot()
+        metric = f"{self.prefix}_operation_seconds"
+        lines = [f"# HELP {metric} Operation latency in seconds.", f"# TYPE {metric} histogram"]
+        for name, summary in snapshot["operations"].items():
+            for bound, cumulative in summary["buckets"].items():
+                lines.append(f'{metric}_bucket{{operation="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{operation="{name}"}} {summary["sum_s"]:.9f}')
+            lines.append(f'{metric}_count{{operation="{name}"}} {summary["count"]}')
+        errors = f"{self.prefix}_operation_errors_total"
+        lines += [f"# HELP {errors} Operations that raised.", f"# TYPE {errors} counter"]
+        for name, summary in snapshot["operations"].items():
+            lines.append(f'{errors}{{operation="{name}"}} {summary["errors"]}')
+        for name, value in snapshot["counters"].items():
+            lines += [f"# TYPE {self.prefix}_{name}_total counter", f"{self.prefix}_{name}_total {value}"]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def instrumented(name=None, registry=None):
+    """
+    Decorator recording every call of a function (or coroutine function) under `name`.
+    Wrapping an already-instrumented function with the same name returns it unchanged.
+    """
+    def decorate(func):
+        operation = name or func.__qualname__
+        if getattr(func, "instrumented_name", None) == operation:
+            return func
+        target = registry or REGISTRY
+        from inspect import iscoroutinefunction
+
+        if iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with target.timer(operation):
+                    return await func(*args, **kwargs)
+            wrapper = async_wrapper
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with target.timer(operation):
+                    return func(*args, **kwargs)
+        wrapper.instrumented_name = operation
+        return wrapper
+    return decorate
+
+
+def record_results(path, results, registry=None):
+    """
+    Write benchmark results plus environment details and a metrics snapshot to JSON.
+
+    Returns:
+        dict: The recorded document
+    """
+    import json
+    import platform
+
+    document = {
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+        "metrics": (registry or REGISTRY).snapshot(),
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, default=str)
+    return document
+
+
+def compare_results(baseline, current, tolerance=0.2):
+    """
+    Compare two {benchmark: {metric: value}} result dicts.
+
+    Only metrics with a known direction (see *_IS_BETTER_SUFFIXES) are checked.
+
+    Returns:
+        list: (benchmark, metric, baseline, current, relative change) for each regression
+              worse than `tolerance` (0.2 = 20%)
+    """
+    regressions = []
+    for bench, metrics in current.items():
+        for metric, value in metrics.items():
+            base = baseline.get(bench, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(base, (int, float)) or not base:
+                continue
+            change = (value - base) / abs(base)
+            if metric.endswith(HIGHER_IS_BETTER_SUFFIXES):
+                worse = change < -tolerance
+            elif metric.endswith(LOWER_IS_BETTER_SUFFIXES):
+                worse = change > tolerance
+            else:
+                continue
+            if worse:
+                regressions.append((bench, metric, base, value, change))
+    return regressions